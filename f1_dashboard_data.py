@@ -0,0 +1,365 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import numba  # Optional: only needed for engine='numba'
+except ImportError:
+    numba = None
+
+def load_csv(path, column_types, cache_dir=None):
+    """
+    Reads selected columns of a CSV file into a DataFrame with Arrow-backed dtypes.
+    The file is memory-mapped, so its bytes are served from the OS page cache rather
+    than copied into Python, and PyArrow parses it in parallel blocks.
+
+    Args:
+        path (str): The CSV file path.
+        column_types (dict): The columns to read, mapped to their Arrow types.
+        cache_dir (str, optional): Directory for a Parquet copy of the parsed columns.
+                                   Later runs read the Parquet file instead of re-parsing
+                                   the CSV, as long as the CSV's size and modification
+                                   time are unchanged.
+
+    Returns:
+        pd.DataFrame: The requested columns.
+    """
+    if cache_dir is not None:
+        # Key the cache file on the resolved CSV path and the requested schema, so other
+        # data directories or column selections never share a cached copy
+        schema = pa.schema(list(column_types.items()))
+        cache_key = hashlib.sha1(f"{os.path.realpath(path)}\n{schema}".encode()).hexdigest()[:16]
+        cache_name = os.path.splitext(os.path.basename(path))[0]
+        cache_path = os.path.join(cache_dir, f"{cache_name}-{cache_key}.parquet")
+
+        # The cached copy records the size and modification time of the CSV it was
+        # parsed from; it is only reused while those still match
+        source_stat = os.stat(path)
+        source_version = f"{source_stat.st_size}:{source_stat.st_mtime_ns}".encode()
+        try:
+            if pq.read_schema(cache_path).metadata.get(b'source_version') == source_version:
+                return pq.read_table(cache_path).to_pandas(types_mapper=pd.ArrowDtype)
+        except (OSError, pa.ArrowInvalid):
+            pass # No usable cached copy (missing or unreadable); parse the CSV
+
+    def read_columns(types):
+        try:
+            source = pa.memory_map(path, 'r')
+        except FileNotFoundError as e:
+            # Keep the missing path on the error, as the pandas reader did
+            raise FileNotFoundError(e.errno, e.strerror, path) from e
+        with source:
+            return pa_csv.read_csv(
+                source,
+                read_options=pa_csv.ReadOptions(use_threads=True, block_size=8 << 20),
+                # '\N' is the null marker used throughout the Ergast F1 CSVs
+                convert_options=pa_csv.ConvertOptions(include_columns=list(types),
+                                                      column_types=types,
+                                                      null_values=['\\N', '']),
+            )
+
+    try:
+        table = read_columns(column_types)
+    except pa.ArrowInvalid:
+        # A numeric column holds a non-numeric value (e.g. 'R' for retired). Re-read the
+        # numeric columns as text and coerce such values to null, as
+        # pd.to_numeric(errors='coerce') did before the typed parse
+        numeric_columns = [name for name, arrow_type in column_types.items()
+                           if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type)]
+        table = read_columns({name: pa.string() if name in numeric_columns else arrow_type
+                              for name, arrow_type in column_types.items()})
+        for name in numeric_columns:
+            values = pd.to_numeric(table[name].to_pandas(), errors='coerce')
+            table = table.set_column(table.schema.get_field_index(name), name,
+                                     pa.array(values, type=column_types[name], from_pandas=True))
+
+    if cache_dir is not None:
+        # Write to a temporary file and move it into place, so an interrupted run
+        # never leaves a truncated cache file behind
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.parquet.tmp')
+        os.close(fd)
+        try:
+            pq.write_table(table.replace_schema_metadata({'source_version': source_version}), tmp_path)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+def save_csv(df, path):
+    """
+    Writes a DataFrame to CSV with PyArrow's multithreaded writer.
+
+    Args:
+        df (pd.DataFrame): The data to write; its index is not written.
+        path (str): The output CSV file path.
+    """
+    pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+
+def grouped_mean(codes, values, n_groups):
+    """
+    Averages values per group, skipping NaN values.
+    Written as a plain loop so it can be compiled with Numba.
+
+    Args:
+        codes (np.ndarray): Integer group code (0 to n_groups - 1) for each value.
+        values (np.ndarray): The float values to average.
+        n_groups (int): The number of groups.
+
+    Returns:
+        np.ndarray: The mean of each group (NaN for groups with no valid values).
+    """
+    sums = np.zeros(n_groups)
+    counts = np.zeros(n_groups)
+    for i in range(len(codes)):
+        if not np.isnan(values[i]):
+            sums[codes[i]] += values[i]
+            counts[codes[i]] += 1
+    return sums / counts
+
+# Create the Numba dispatcher once rather than on every pipeline run. It compiles lazily:
+# the first engine='numba' run compiles the kernel (or loads it from Numba's on-disk cache)
+grouped_mean_jit = numba.njit(cache=True)(grouped_mean) if numba is not None else None
+
+def leaderboard(df, column, ascending=False, top_n=None):
+    """
+    Orders a statistic for output, optionally keeping only its top rows.
+
+    Args:
+        df (pd.DataFrame): The statistic to order.
+        column (str): The column to rank by.
+        ascending (bool): Whether smaller values rank first (e.g. finish positions).
+        top_n (int, optional): Keep only the best top_n rows. Uses a partial sort
+                               (nlargest/nsmallest) instead of sorting every row.
+
+    Returns:
+        pd.DataFrame: The ordered rows.
+    """
+    if top_n is None:
+        return df.sort_values(by=column, ascending=ascending)
+    if ascending:
+        return df.nsmallest(top_n, column)
+    return df.nlargest(top_n, column)
+
+def build_average_positions_gained(qualifying_df, results_df, driver_name, output_dir, engine='pandas', top_n=None):
+    """
+    Calculates each driver's average positions gained from qualifying to race finish
+    and saves it to average_positions_gained.csv.
+
+    Args:
+        qualifying_df (pd.DataFrame): Qualifying positions (raceId, driverId, position).
+        results_df (pd.DataFrame): Prepared race results.
+        driver_name (pd.Series): Driver names indexed by driverId.
+        output_dir (str): The directory to save the CSV file in.
+        engine (str): 'pandas' or 'numba', see process_f1_data.
+        top_n (int, optional): Keep only the top_n drivers, see process_f1_data.
+    """
+    # Select relevant columns and rename for clarity
+    qualifying_positions = qualifying_df[['raceId', 'driverId', 'position']].rename(columns={'position': 'qualifyingPosition'})
+    race_finish_positions = results_df[['raceId', 'driverId', 'positionOrder']].rename(columns={'positionOrder': 'raceFinishPosition'})
+
+    # Give qualifying driverId the same categorical dtype as results, so the merge joins on
+    # the shared integer codes instead of falling back to object keys for mismatched dtypes
+    qualifying_positions['driverId'] = qualifying_positions['driverId'].astype(results_df['driverId'].dtype)
+
+    # Merge qualifying and race finish positions
+    # Use 'inner' merge to only include races where both qualifying and race results exist for a driver
+    merged_positions = pd.merge(qualifying_positions, race_finish_positions,
+                                on=['raceId', 'driverId'], how='inner', sort=False)
+
+    # Calculate positions gained: qualifying position - race finish position
+    # A positive value means positions were gained (finished better than qualified)
+    # A negative value means positions were lost (finished worse than qualified)
+    # Both positions are already numeric: load_csv turns empty fields, '\N' and other
+    # non-numeric values (e.g. 'R') into nulls, which leave the row NA here and are
+    # skipped by the mean below, so no separate filter is needed
+    merged_positions['positionsGained'] = merged_positions['qualifyingPosition'] - merged_positions['raceFinishPosition']
+
+    # Calculate average positions gained per driver
+    if engine == 'numba':
+        # Factorize driverId into integer codes and reduce them with the compiled kernel
+        codes, driver_ids = pd.factorize(merged_positions['driverId'])
+        positions_gained = merged_positions['positionsGained'].to_numpy(dtype='float64', na_value=np.nan)
+        # Rows with a missing driverId get code -1; drop them, as the pandas groupby does
+        has_driver = codes >= 0
+        codes, positions_gained = codes[has_driver], positions_gained[has_driver]
+        average_positions_gained = pd.DataFrame({
+            'driverId': driver_ids,
+            'AveragePositionsGained': grouped_mean_jit(codes, positions_gained, len(driver_ids)),
+        })
+    else:
+        average_positions_gained = merged_positions.groupby('driverId', as_index=False, observed=True, sort=False).agg(
+            AveragePositionsGained=('positionsGained', 'mean'))
+
+    # Attach driver names
+    average_positions_gained['driverName'] = driver_name.reindex(average_positions_gained['driverId']).to_numpy()
+    average_positions_gained = leaderboard(average_positions_gained[['driverName', 'AveragePositionsGained']],
+                                           'AveragePositionsGained', top_n=top_n)
+
+    save_csv(average_positions_gained, os.path.join(output_dir, 'average_positions_gained.csv'))
+
+def build_driver_career_stats(results_df, driver_name, output_dir, top_n=None):
+    """
+    Calculates total career races, average career finish position and total career
+    points per driver and saves them to total_career_races.csv,
+    average_career_finish_position.csv and total_career_points_drivers.csv.
+
+    Args:
+        results_df (pd.DataFrame): Prepared race results.
+        driver_name (pd.Series): Driver names indexed by driverId.
+        output_dir (str): The directory to save the CSV files in.
+        top_n (int, optional): Keep only the top_n drivers, see process_f1_data.
+    """
+    # The statistics all group results_df by driverId, so compute them in a single groupby pass
+    driver_stats = results_df.groupby('driverId', observed=True, sort=False).agg(
+        AverageFinishPosition=('positionOrder', 'mean'),  # mean skips missing (NA) positions
+        TotalCareerPoints=('points', 'sum'),
+    )
+
+    # Count unique races per driver without a per-group hash set: combine the driver's
+    # category code and raceId into one integer key, take the unique keys and count
+    # them per driver code
+    # Rows with a missing driverId (code -1) or raceId are skipped, as nunique skips them
+    driver_codes = results_df['driverId'].cat.codes.to_numpy(dtype='int64')
+    has_race = results_df['raceId'].notna().to_numpy(dtype=bool) & (driver_codes >= 0)
+    driver_codes = driver_codes[has_race]
+    race_ids = results_df['raceId'].to_numpy(dtype='int64', na_value=0)[has_race]
+    race_key_span = race_ids.max() + 1 if len(race_ids) else 1
+    unique_keys = np.unique(driver_codes * race_key_span + race_ids)
+    races_per_code = np.bincount(unique_keys // race_key_span,
+                                 minlength=len(results_df['driverId'].cat.categories))
+    driver_stats['TotalCareerRaces'] = races_per_code[driver_stats.index.codes]
+
+    # Attach driver names once for all three statistics
+    driver_stats['driverName'] = driver_name.reindex(driver_stats.index).to_numpy()
+
+    total_career_races_df = leaderboard(driver_stats[['driverName', 'TotalCareerRaces']], 'TotalCareerRaces', top_n=top_n)
+    save_csv(total_career_races_df, os.path.join(output_dir, 'total_career_races.csv'))
+
+    avg_finish_position_df = leaderboard(driver_stats[['driverName', 'AverageFinishPosition']], 'AverageFinishPosition',
+                                         ascending=True, top_n=top_n)
+    save_csv(avg_finish_position_df, os.path.join(output_dir, 'average_career_finish_position.csv'))
+
+    total_driver_points_df = leaderboard(driver_stats[['driverName', 'TotalCareerPoints']], 'TotalCareerPoints', top_n=top_n)
+    save_csv(total_driver_points_df, os.path.join(output_dir, 'total_career_points_drivers.csv'))
+
+def build_total_team_points(results_df, team_name, output_dir, top_n=None):
+    """
+    Calculates the total points scored by each F1 team (constructor)
+    and saves them to total_career_points_teams.csv.
+
+    Args:
+        results_df (pd.DataFrame): Prepared race results.
+        team_name (pd.Series): Constructor names indexed by constructorId.
+        output_dir (str): The directory to save the CSV file in.
+        top_n (int, optional): Keep only the top_n teams, see process_f1_data.
+    """
+    total_team_points = results_df.groupby('constructorId', as_index=False, observed=True, sort=False).agg(
+        TotalTeamPoints=('points', 'sum'))
+
+    # Attach constructor names
+    total_team_points['TeamName'] = team_name.reindex(total_team_points['constructorId']).to_numpy()
+    total_team_points_df = leaderboard(total_team_points[['TeamName', 'TotalTeamPoints']], 'TotalTeamPoints', top_n=top_n)
+
+    save_csv(total_team_points_df, os.path.join(output_dir, 'total_career_points_teams.csv'))
+
+def process_f1_data(data_dir='data', engine='pandas', top_n=None, cache_dir='cache'):
+    """
+    Loads F1 data from CSV files, calculates various statistics,
+    and saves them into new CSV files.
+
+    Args:
+        data_dir (str): The directory where the F1 CSV files are located.
+        engine (str): 'pandas' or 'numba'. With 'numba', the average positions gained
+                      reduction runs as a compiled Numba kernel, which scales better
+                      on large (e.g. lap-level) inputs.
+        top_n (int, optional): Write only the top_n rows of each statistic (e.g. for a
+                               dashboard leaderboard). By default every row is written.
+        cache_dir (str, optional): Directory where the parsed inputs are cached as Parquet
+                                   so later runs skip CSV parsing. None disables the cache.
+    """
+    if engine not in ('pandas', 'numba'):
+        print(f"Error: Unknown engine '{engine}'. Use engine='pandas' or engine='numba'.")
+        return
+    if engine == 'numba' and numba is None:
+        print("Error: engine='numba' requires the numba package. Install it or use engine='pandas'.")
+        return
+
+    print(f"Loading data from {data_dir}...")
+
+    try:
+        # Load datasets, parsing only the columns the statistics below actually use
+        # (races.csv is not needed for any of the outputs, so it is not read at all).
+        # The explicit types let the parser skip type inference.
+        drivers_df = load_csv(os.path.join(data_dir, 'drivers.csv'),
+                              {'driverId': pa.int32(), 'forename': pa.string(), 'surname': pa.string()}, cache_dir)
+        results_df = load_csv(os.path.join(data_dir, 'results.csv'),
+                              {'raceId': pa.int32(), 'driverId': pa.int32(), 'constructorId': pa.int32(),
+                               'positionOrder': pa.int16(), 'points': pa.float64()}, cache_dir)
+        qualifying_df = load_csv(os.path.join(data_dir, 'qualifying.csv'),
+                                 {'raceId': pa.int32(), 'driverId': pa.int32(), 'position': pa.int16()}, cache_dir)
+        constructors_df = load_csv(os.path.join(data_dir, 'constructors.csv'),
+                                   {'constructorId': pa.int32(), 'name': pa.string()}, cache_dir) # Load constructors data
+        print("All raw data loaded successfully.")
+
+    except FileNotFoundError as e:
+        print(f"Error: One or more required CSV files not found. Make sure '{data_dir}' exists and contains all files.")
+        print(f"Missing file: {e.filename}")
+        return
+    except pa.ArrowInvalid as e:
+        print(f"Error: One or more CSV files in '{data_dir}' could not be parsed.")
+        print(f"Details: {e}")
+        return
+
+    # Prepare the shared results data once: the driver and constructor IDs become
+    # categoricals so every groupby below reuses the same integer codes. The numeric
+    # columns are already parsed into their final types, so they need no further
+    # conversion: positions are narrowed to int16, while points stay float64 because
+    # float32 cannot hold fractional points (e.g. 8.14) exactly and the error shows
+    # up in the summed totals.
+    results_df['driverId'] = results_df['driverId'].astype('category')
+    results_df['constructorId'] = results_df['constructorId'].astype('category')
+
+    # Build the name lookups once; each output attaches names by reindexing them with its ID column.
+    # The names are joined by Arrow's string kernel over the Arrow-backed columns
+    drivers_df['driverName'] = drivers_df['forename'].str.cat(drivers_df['surname'], sep=' ')
+    driver_name = drivers_df.set_index('driverId')['driverName']
+    team_name = constructors_df.set_index('constructorId')['name']
+
+    output_dir = 'processed_data'
+    os.makedirs(output_dir, exist_ok=True) # Create output directory if it doesn't exist
+
+    # The statistics only read the shared data, so build them concurrently; each task
+    # saves its own CSV files. pandas and PyArrow release the GIL in their groupby,
+    # merge and CSV-writing kernels, so the threads overlap.
+    tasks = {
+        'Average Positions Gained': (build_average_positions_gained,
+                                     (qualifying_df, results_df, driver_name, output_dir, engine, top_n)),
+        'Total Career Races, Average Career Finish Position and Total Career Points for Drivers':
+            (build_driver_career_stats, (results_df, driver_name, output_dir, top_n)),
+        'Most Points Scored by F1 Teams': (build_total_team_points, (results_df, team_name, output_dir, top_n)),
+    }
+    print("Calculating statistics...")
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = {executor.submit(fn, *args): name for name, (fn, args) in tasks.items()}
+        for future in as_completed(futures):
+            future.result() # Re-raise any error from the task
+            print(f"{futures[future]} calculated.")
+
+    print(f"\nProcessed data saved to '{output_dir}' directory:")
+    print(f"- average_positions_gained.csv")
+    print(f"- total_career_races.csv")
+    print(f"- average_career_finish_position.csv")
+    print(f"- total_career_points_drivers.csv")
+    print(f"- total_career_points_teams.csv")
+    print("\nData processing complete. You can now import these CSVs into Power BI.")
+
+if __name__ == "__main__":
+    process_f1_data()